@@ -1,13 +1,29 @@
 import sys
 import argparse
+import asyncio
 import csv
+from collections import defaultdict
+import logging
 import re
+from logging.handlers import MemoryHandler
 from resource import Resource
 from datetime import datetime
 
 # Define a list of CSV headers.
 CSV_HEADERS = ["URL", "Domain", "Type", "Tag", "Error"]
 
+# Define the write buffer size of the CSV file, in bytes.
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# Define the maximum number of concurrent fetches to a single host.
+MAX_FETCHES_PER_HOST = 6
+
+# Define the pattern of a valid CSV file name.
+FILE_NAME = re.compile(r"([\w-]{1,12})(\.csv)$")
+
+# Define the logger of the program.
+log = logging.getLogger("wrp")
+
 # Define a parser for command-line arguments.
 parser = argparse.ArgumentParser(
     description="Tool parses valid HTML resources, identifies links to internal or external resources, and captures response headers in a CSV file."
@@ -20,76 +36,182 @@ def main():
     This function parses command-line arguments, processes URLs, and generates a CSV file.
     """
     start_time = datetime.now()
+    init_logging()
     init_argv()
-    urls = get_urls(parser.parse_args().resource)
-    file = get_file_name(parser.parse_args().file_name)
-    headers = allowed_headers(parser.parse_args().response_headers)
-    tags = get_tags(parser.parse_args().tags)
-    flag = get_flag(parser.parse_args().enable_external_link_processing)
-    data = get_response_data(urls, headers, tags, flag)
-    write_to_csv(data, file, headers)
+    args = parser.parse_args()
+    urls = get_urls(args.resource)
+    file = get_file_name(args.file_name, start_time)
+    headers = allowed_headers(args.response_headers)
+    tags = get_tags(args.tags)
+    flag = get_flag(args.enable_external_link_processing)
+    field_names = get_field_names(headers)
+    with open(
+        file, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE
+    ) as csvfile:
+        writer = csv_writer(csvfile, field_names)
+        get_response_data(urls, headers, tags, flag, args, writer)
     td = datetime.now() - start_time
-    print(f"[INFO] Overall execution time [{get_readable_time(td)}]")
+    log.info("Overall execution time [%s]", get_readable_time(td))
 
 
-def get_response_data(urls, headers, tags, flag):
+def get_response_data(urls, headers, tags, flag, args, writer):
     """
     Retrieve response data for the provided URLs.
-    This function processes each URL, extracts information, and updates the data list.
+    This function processes each URL, extracts information, and writes it to the CSV file.
 
     Args:
     urls (list): A list of URLs to process.
     headers (list): A list of response headers to include in the CSV.
     tags (list): A list of HTML tags allowed for parsing.
     flag (bool): A flag to enable or disable external link processing.
+    args (argparse.Namespace): The parsed command-line arguments.
+    writer (csv.writer): The writer of the CSV file.
+    """
+    asyncio.run(process_urls(urls, headers, tags, flag, args, writer))
+
+
+async def process_urls(urls, headers, tags, flag, args, writer):
+    """
+    Process the URLs concurrently over a single client session, so connections and host lookups are reused across all pages and references.
+
+    Args:
+    urls (list): A list of URLs to process.
+    headers (list): A list of response headers to include in the CSV.
+    tags (list): A list of HTML tags allowed for parsing.
+    flag (bool): A flag to enable or disable external link processing.
+    args (argparse.Namespace): The parsed command-line arguments.
+    writer (csv.writer): The writer of the CSV file.
+    """
+    # Fetches of references shared across all pages, keyed by link
+    fetches = {}
+    # Limits on the concurrent fetches to each host, keyed by root URL
+    host_limits = defaultdict(lambda: asyncio.Semaphore(MAX_FETCHES_PER_HOST))
+    async with Resource.create_session() as session:
+        await asyncio.gather(
+            *(
+                process_url(
+                    session,
+                    fetches,
+                    host_limits,
+                    url,
+                    headers,
+                    tags,
+                    flag,
+                    args,
+                    writer,
+                )
+                for url in urls
+            )
+        )
+
+
+async def process_url(
+    session, fetches, host_limits, url, headers, tags, flag, args, writer
+):
+    """
+    Fetch a page and concurrently fetch every reference found in it.
+    Each reference is fetched as soon as it is parsed, and a CSV row is written as each reference fetch completes.
+
+    Args:
+    session (httpx.AsyncClient): The client session used to issue the requests.
+    fetches (dict): Fetches of references shared across all pages, keyed by link.
+    host_limits (dict): Limits on the concurrent fetches to each host, keyed by root URL.
+    url (str): The URL of the page to process.
+    headers (list): A list of response headers to include in the CSV.
+    tags (list): A list of HTML tags allowed for parsing.
+    flag (bool): A flag to enable or disable external link processing.
+    args (argparse.Namespace): The parsed command-line arguments.
+    writer (csv.writer): The writer of the CSV file.
+    """
+    start_time = datetime.now()
+    log.info("***Processing [%s] with args [%s]", url, args)
+    r = Resource(
+        path=url,
+        allowed_headers=headers,
+        enable_external_link_processing=flag,
+        process_src=True,
+        allowed_tags=tags,
+    )
+    await fetch_resource(session, host_limits, r)
+    seen = set()
+    pending = []
+    for link, tag, _, is_bad_link in r.children:
+        # Add source tag information only if the links are invalid or not processed
+        tag = str(tag) if is_bad_link else ""
+        if (link, tag) in seen:
+            # Skip references repeated within the page
+            continue
+        seen.add((link, tag))
+        fetch = fetch_reference(
+            session, fetches, host_limits, link, headers, tags, flag
+        )
+        fetch.add_done_callback(
+            lambda fetch, tag=tag: update_data(
+                fetch.result(), tag, headers, writer=writer
+            )
+        )
+        pending.append(fetch)
+        # Let the scheduled fetches start while the rest of the page is parsed
+        await asyncio.sleep(0)
+    if pending:
+        log.info("***Update CSV with valid and invalid references of [%s]", url)
+        await asyncio.wait(pending)
+    if not pending or r.error:
+        # Network resources are blank if the page doesn't exist or the domain is invalid,
+        # and a page that failed to parse partway is listed with its error
+        update_data(resource=r, tag="", headers=headers, writer=writer)
+    td = datetime.now() - start_time
+    log.info(
+        "Time to parse and generate CSV for [%s] is [%s]", url, get_readable_time(td)
+    )
+
+
+def fetch_reference(session, fetches, host_limits, link, headers, tags, flag):
+    """
+    Schedule the fetch of the response headers of a reference found in a page.
+    A reference already fetched for another page is not fetched again.
+
+    Args:
+    session (httpx.AsyncClient): The client session used to issue the request.
+    fetches (dict): Fetches of references shared across all pages, keyed by link.
+    host_limits (dict): Limits on the concurrent fetches to each host, keyed by root URL.
+    link (str): The reference link to fetch.
+    headers (list): A list of response headers to include in the CSV.
+    tags (list): A list of HTML tags allowed for parsing.
+    flag (bool): A flag to enable or disable external link processing.
 
     Returns:
-    list: A list of dictionaries containing response data.
-    """
-    data = []
-    for url in urls:
-        start_time = datetime.now()
-        print(f"***Processing [{url}] with args [{parser.parse_args()}]")
-        r = Resource(
-            path=url,
+    asyncio.Task: The fetch of the reference, resulting in the fetched resource.
+    """
+    if link not in fetches:
+        resource = Resource(
+            path=link,
             allowed_headers=headers,
             enable_external_link_processing=flag,
-            process_src=True,
+            process_src=False,
             allowed_tags=tags,
         )
-        if r.children:
-            # Iterate through valid references and extract data
-            print("***Update CSV with valid references")
-            for nr in r.children:
-                valid_link = Resource(
-                    path=nr["link"],
-                    allowed_headers=headers,
-                    enable_external_link_processing=flag,
-                    process_src=False,
-                    allowed_tags=tags,
-                )
-                update_data(valid_link, tag="", data=data)
-        if r.children_invalid:
-            # Iterate through invalid references and extract data
-            print("***Update CSV with invalid resources")
-            for bnr in r.children_invalid:
-                invalid_resource = Resource(
-                    path=bnr["link"],
-                    allowed_headers=headers,
-                    enable_external_link_processing=flag,
-                    process_src=False,
-                    allowed_tags=tags,
-                )
-                # Add source tag information only if the links are invalid or not processed
-                update_data(invalid_resource, bnr["tag"], data=data)
-        if not r.children and not r.children_invalid:
-            # Network resources are blank if the page doesn't exist or the domain is invalid
-            update_data(resource=r, tag="", data=data)
-        td = datetime.now() - start_time
-        print(
-            f"[INFO] Time to parse and generate CSV for [{url}] is [{get_readable_time(td)}]"
+        fetches[link] = asyncio.ensure_future(
+            fetch_resource(session, host_limits, resource)
         )
-    return data
+    return fetches[link]
+
+
+async def fetch_resource(session, host_limits, resource):
+    """
+    Fetch a resource, waiting while its host already has the maximum number of fetches in flight.
+    This keeps hosts that do not multiplex requests over HTTP/2 from receiving one connection per reference.
+
+    Args:
+    session (httpx.AsyncClient): The client session used to issue the request.
+    host_limits (dict): Limits on the concurrent fetches to each host, keyed by root URL.
+    resource (Resource): The resource to fetch.
+
+    Returns:
+    Resource: The fetched resource.
+    """
+    async with host_limits[resource.url_root]:
+        return await resource.fetch(session)
 
 
 def get_readable_time(delta):
@@ -105,64 +227,73 @@ def get_readable_time(delta):
     return f"{delta.days} hr, {delta.seconds} sec, {delta.microseconds} µs"
 
 
-def write_to_csv(data, file, headers):
+def get_field_names(headers):
     """
-    Write data to a CSV file.
+    Get the column names of the CSV file, in the order of the values written by update_data.
 
     Args:
-    data (list): A list of dictionaries containing response data.
-    file (str): The name of the CSV file to write.
     headers (list): A list of response headers to include in the CSV.
+
+    Returns:
+    list: The column names of the CSV file.
     """
-    with open(file, "w", newline="", encoding="utf-8") as csvfile:
-        csv_field_names = []
-        csv_field_names.append(CSV_HEADERS[0])
-        csv_field_names.append(CSV_HEADERS[1])
-        csv_field_names.append(CSV_HEADERS[2])
-        csv_field_names.extend(headers)
-        csv_field_names.append(CSV_HEADERS[3])
-        csv_field_names.append(CSV_HEADERS[4])
-        writer = csv.DictWriter(csvfile, fieldnames=csv_field_names)
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
+    return [CSV_HEADERS[0], CSV_HEADERS[1], CSV_HEADERS[2], *headers, *CSV_HEADERS[3:]]
 
 
-def update_data(resource, tag, data):
+def csv_writer(csvfile, field_names):
     """
-    Update the data list with resource information.
+    Create a CSV writer and write the header row.
 
     Args:
-    resource (Resource): The resource object containing information to be added to the data list.
+    csvfile (file): The CSV file to write to.
+    field_names (list): The column names of the CSV file.
+
+    Returns:
+    csv.writer: The writer of the CSV file.
+    """
+    writer = csv.writer(csvfile)
+    writer.writerow(field_names)
+    return writer
+
+
+def update_data(resource, tag, headers, writer):
+    """
+    Write a CSV row with resource information.
+
+    Args:
+    resource (Resource): The resource object containing information to be written to the CSV file.
     tag (str): The HTML tag associated with the resource.
-    data (list): A list of dictionaries containing response data.
+    headers (list): A list of response headers to include in the CSV.
+    writer (csv.writer): The writer of the CSV file.
     """
-    print(f"Updating the CSV with resource [{resource.path}]")
-    entry = {}
+    log.debug("Updating the CSV with resource [%s]", resource.path)
     response_headers = resource.filtered_headers
-    entry[CSV_HEADERS[0]] = resource.path
-    entry[CSV_HEADERS[1]] = resource.domain
-    entry[CSV_HEADERS[2]] = resource.type
-    if response_headers:
-        entry.update(response_headers)
-    entry[CSV_HEADERS[3]] = tag
-    entry[CSV_HEADERS[4]] = resource.error
-    data.append(entry)
+    writer.writerow(
+        (
+            resource.path,
+            resource.domain,
+            resource.type,
+            *(response_headers.get(header, "") for header in headers),
+            tag,
+            resource.error,
+        )
+    )
 
 
-def get_file_name(name):
+def get_file_name(name, time=None):
     """
     Get a valid CSV file name.
 
     Args:
     name (str): The provided file name.
+    time (datetime, optional): The timestamp of the run. Default is the current time.
 
     Returns:
     str: A valid CSV file name with a timestamp.
     """
-    if matches := re.match(r"([\w-]{1,12})(.csv)", name):
-        time = datetime.now().strftime("%Y%m%d%H%M%S")
-        return f"{matches.group(1)}-{time}{matches.group(2)}"
+    if matches := FILE_NAME.match(name):
+        timestamp = (time or datetime.now()).strftime("%Y%m%d%H%M%S")
+        return f"{matches.group(1)}-{timestamp}{matches.group(2)}"
     else:
         sys.exit(
             "Invalid CSV file name. Make sure the file name does not exceed 12 characters, excluding the extension."
@@ -183,7 +314,7 @@ def get_urls(urls):
     if urls:
         for url in urls:
             if not Resource.is_valid_url(url):
-                print(f"Invalid URL [{url}]")
+                log.warning("Invalid URL [%s]", url)
             else:
                 valid_urls.append(url)
     else:
@@ -233,6 +364,18 @@ def allowed_headers(headers):
     return headers
 
 
+def init_logging():
+    """
+    Initialize logging to the standard output.
+    Records are buffered and written in batches, or as soon as an error is logged.
+    Failures of individual references are logged as warnings, so they do not flush the buffer.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    log.addHandler(MemoryHandler(capacity=1024, target=handler))
+    log.setLevel(logging.INFO)
+
+
 def init_argv():
     """
     Initialize command-line arguments and parse them.
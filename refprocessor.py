@@ -1,6 +1,10 @@
-import re
+import logging
 from urllib.parse import urlparse
-from pathlib import PurePosixPath
+
+# Prefixes of references that are kept as they are
+NON_NAVIGABLE_PREFIXES = ("#", "tel:", "javascript:void")
+
+log = logging.getLogger("wrp")
 
 
 class RefProcessor:
@@ -21,7 +25,7 @@ class RefProcessor:
 
     Methods:
         __init__(self, resource, reference): Constructor for RefProcessor class.
-        _relative_path(self, resource, reference, matches): Internal method to process relative paths.
+        _relative_path(self, resource, reference): Internal method to process relative paths.
 
     Examples:
         To process a reference within a web resource:
@@ -47,18 +51,24 @@ class RefProcessor:
             if resource.url_root == resource.get_url_root(reference):
                 # Reference that has the same domain as the page
                 self.link = reference
-            elif self.enable_external_link_processing and re.match(
-                r"(^//[.]*.+)", reference
+            elif (
+                self.enable_external_link_processing
+                and reference.startswith("//")
+                and len(reference) > 2
             ):
                 # Reference that starts with '//' - External link but within the same org. Ex://en.wikipedia.org/
                 self.link = f"https:{reference}"
-            elif re.match(r"(^/[^/][.]*.*)", reference):
+            elif (
+                reference.startswith("/")
+                and not reference.startswith("//")
+                and len(reference) > 1
+            ):
                 # Reference that starts with '/' but not '//'
                 self.link = f"{resource.url_root}{reference}"
-            elif matches := re.match(r"(^\.\./)\1*", reference):
+            elif reference.startswith("../"):
                 # Reference that starts with '../' pattern and/or repeats itself
-                self.link = self._relative_path(resource, reference, matches)
-            elif re.match(r"^(#|tel:|javascript:void)", reference):
+                self.link = self._relative_path(resource, reference)
+            elif reference.startswith(NON_NAVIGABLE_PREFIXES):
                 # Reference that starts with # or tel: or javascript:void
                 self.link = reference
             elif (
@@ -73,28 +83,26 @@ class RefProcessor:
                 self.link = reference
             else:
                 # All other reference patterns are invalid or bad links
-                print(f"No parsing logic for [{reference}]")
+                log.debug("No parsing logic for [%s]", reference)
                 self.bad_link = reference
 
-    def _relative_path(self, resource, reference, matches):
+    def _relative_path(self, resource, reference):
         """
         Process relative paths within the web resource.
 
         Args:
             resource (Resource): The resource object representing the web page.
-            reference (str): The reference to be processed.
-            matches (re.Match): A regular expression match object for '../' patterns.
+            reference (str): The reference to be processed, starting with '../'.
 
         Returns:
             str: The processed relative reference.
         """
-        dd_path = matches.group()
-        relative_path = reference.replace(dd_path, "")
-        prefix_path = urlparse(resource.path).path
-        while True:
-            if "../" in dd_path:
-                dd_path = dd_path.removeprefix("../")
-                prefix_path = PurePosixPath(prefix_path).parent
-            else:
-                break
-        return f"{resource.url_root}{prefix_path.joinpath(relative_path)}"
+        relative_path = reference
+        levels = 0
+        while relative_path.startswith("../"):
+            relative_path = relative_path[3:]
+            levels += 1
+        # Drop one trailing path segment for each '../'
+        segments = urlparse(resource.path).path.rstrip("/").split("/")
+        prefix_path = "/".join(segments[:-levels])
+        return f"{resource.url_root}{prefix_path}/{relative_path}"
@@ -1,10 +1,24 @@
-import urllib.request as request
+import httpx
+import logging
 import validators
+from functools import lru_cache
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup as BS
+from bs4 import BeautifulSoup as BS, SoupStrainer
 from resourcetype import ResourceType
 from refprocessor import RefProcessor as RP
 
+log = logging.getLogger("wrp")
+
+# Request headers sent with every resource fetch
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1",
+    "sec-ch-ua": '"Google Chrome";v="112", " Not;A Brand";v="99", "Chromium";v="112"',
+}
+
+# Connect and read timeouts, in seconds, so that an unresponsive server cannot stall the run.
+# The wait for a free pooled connection is not timed, as every reference fetch is started at once.
+TIMEOUT = httpx.Timeout(15, connect=5, pool=None)
+
 
 class Resource:
     """
@@ -22,32 +36,34 @@ class Resource:
 
     Attributes:
         path (str): The URL or path of the web resource.
-        children (list): List of valid child resources found within the web resource.
-        children_invalid (list): List of invalid or unsupported child resources.
+        children (iterable): Valid and invalid child resources found within the web resource, extracted as they are iterated.
         type (str): The type of the web resource (e.g., "Page", "Image").
         error (str): Any error messages related to the resource.
-        src (bytes): The content of the web resource.
         url_root (str): The root URL of the web resource.
         domain (str): The domain of the web resource.
         allowed_headers (list): A list of allowed HTTP headers to extract.
         allowed_tags (list): A list of HTML tags considered when processing network resources.
+        headers (dict): HTTP headers of the resource.
         filtered_headers (dict): Filtered HTTP headers of the resource.
         enable_external_link_processing (bool): Flag indicating whether to process external links.
         process_src (bool): Flag indicating whether to fetch the resource content.
 
     Methods:
         __init__(self, path, allowed_headers, enable_external_link_processing, process_src, allowed_tags): Constructor for Resource class.
-        _network_resources(self): Extract and process child resources within the web resource.
+        fetch(self, session): Fetch the web resource and capture its response headers.
+        _network_resources(self, raw): Extract and process child resources within the web resource.
         _url_root(self): Extract the root URL of the web resource.
         _domain_name(self): Extract the domain name of the web resource.
         _filter_headers(self): Filter and extract allowed HTTP headers.
-        is_valid_url(cls, url): Check if a URL is valid.
+        is_valid_url(url): Check if a URL is valid.
         is_external_link(cls, reference, url_root): Check if a reference is an external link.
-        get_url_root(cls, url): Extract the root URL from a given URL.
+        get_url_root(url): Extract the root URL from a given URL.
+        create_session(cls): Create a client session whose connections are reused across resources.
 
     Examples:
         To process a web resource and extract child resources:
         >>> resource = Resource("https://example.com/page.html")
+        >>> await resource.fetch(session)
         >>> print(resource.path)
         "https://example.com/page.html"
     """
@@ -71,15 +87,14 @@ class Resource:
             allowed_tags (list, optional): A list of HTML tags to consider when processing network resources. Default is ["img", "source"].
         """
         self.path = path.strip()
-        self.children = []
-        self.children_invalid = []
+        self.children = ()
         self.type = ResourceType.find(path).value
         self.error = ""
-        self.src = ""
         self.url_root = ""
         self.domain = ""
         self.allowed_headers = allowed_headers
         self.allowed_tags = allowed_tags
+        self.headers = {}
         self.filtered_headers = {}
         self.enable_external_link_processing = enable_external_link_processing
         self.process_src = process_src
@@ -87,99 +102,99 @@ class Resource:
         if self.is_valid_url(path):
             self.url_root = self._url_root()
             self.domain = self._domain_name()
-            try:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1",
-                    "sec-ch-ua": '"Google Chrome";v="112", " Not;A Brand";v="99", "Chromium";v="112"',
-                    "referer": self.url_root,
-                }
-                r = request.Request(self.path, headers=headers)
-                with request.urlopen(r) as response:
-                    if response.status == 200:
-                        self.headers = response.headers
-                        self.filtered_headers = self._filter_headers()
-                        if process_src:
-                            self.src = response.read()
-                            self._network_resources()
-                    else:
-                        raise Exception(f"HTTP status code is [{response.status}]")
-            except Exception as e:
-                # Catching exception is intentional; it is not to interrupt the resource processing for any reason
-                self.error = e
-                print(f"[ERROR] Invalid resource [{path}]", e)
-                pass
         else:
             self.error = "Non-parsable URL"
-            print(f"[ERROR] {self.error} [{path}]")
+            log.warning("%s [%s]", self.error, path)
 
-    def _network_resources(self):
+    async def fetch(self, session):
         """
-        Extract and process child resources within the web resource.
+        Fetch the web resource and capture its response headers.
+
+        If process_src is set and the resource is a page, the resource content is read and its child resources
+        are extracted. Otherwise only the response headers are requested with a HEAD request.
+
+        Args:
+            session (httpx.AsyncClient): The client session used to issue the request, see create_session.
 
-        This method extracts and processes child resources such as images, links, and other content
-        within the web resource.
+        Returns:
+            Resource: The fetched resource.
         """
+        if not self.url_root:
+            return self
+        is_page = self.type in [
+            ResourceType.PAGE.value,
+            ResourceType.NO_EXTENSION.value,
+        ]
+        if self.process_src and not is_page:
+            log.error("Not parsing the resource. URL [%s] is not a page.", self.path)
         try:
-            if self.type in [ResourceType.PAGE.value, ResourceType.NO_EXTENSION.value]:
-                soup = BS(self.src, "html.parser")
-                list = []
-                bad_links = []
-                for tag in soup.find_all(self.allowed_tags):
-                    link = ""
-                    match (tag.name):
-                        case "a" | "link":
-                            link = tag.get("href")
-                        case "img" | "script":
-                            link = tag.get("src")
-                        case "source":
-                            link = tag.get("srcset")
-                        case _:
-                            print(f"tag {tag.name} didn't match any case")
-                    rp = RP(self, link)
-                    if rp.link:
-                        is_external_link = self.is_external_link(
-                            reference=rp.link, url_root=self.url_root
-                        )
-                        if (
-                            is_external_link
-                            and not self.enable_external_link_processing
-                        ):
-                            # Handle external links according to your logic
-                            ...
-                        else:
-                            list.append(
-                                {
-                                    "link": rp.link,
-                                    "tag": str(tag),
-                                    "is_external_link": is_external_link,
-                                }
-                            )
-                    else:
-                        is_external_link = self.is_external_link(
-                            reference=rp.bad_link, url_root=self.url_root
-                        )
-                        if (
-                            is_external_link
-                            and not self.enable_external_link_processing
-                        ):
-                            # Handle external links according to your logic
-                            ...
-                        else:
-                            bad_links.append(
-                                {
-                                    "link": rp.bad_link,
-                                    "tag": str(tag),
-                                    "is_external_link": is_external_link,
-                                }
-                            )
-                self.children = list
-                self.children_invalid = bad_links
+            headers = {"referer": self.url_root}
+            method = "GET" if self.process_src and is_page else "HEAD"
+            response = await session.request(method, self.path, headers=headers)
+            if response.status_code == 405 and method == "HEAD":
+                # Fall back to GET for servers that do not allow HEAD requests,
+                # closing the response as soon as its headers arrive, without reading the body
+                request = session.build_request("GET", self.path, headers=headers)
+                response = await session.send(request, stream=True)
+                await response.aclose()
+            if response.status_code == 200:
+                self.headers = response.headers
+                self.filtered_headers = self._filter_headers()
+                if self.process_src and is_page:
+                    # Child resources are extracted lazily, as they are iterated
+                    self.children = self._network_resources(response.content)
             else:
-                print(
-                    f"[ERROR] Not parsing the resource. URL [{self.path}] is not a page."
+                self.error = f"HTTP status code is [{response.status_code}]"
+        except Exception as e:
+            # Catching exception is intentional; it is not to interrupt the resource processing for any reason
+            # Some exceptions, such as timeouts, have no message, so the exception type is always recorded
+            self.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        if self.error:
+            log.warning("Invalid resource [%s] %s", self.path, self.error)
+        return self
+
+    def _network_resources(self, raw):
+        """
+        Extract and process child resources within the web resource.
+
+        This generator extracts and processes child resources such as images, links, and other content
+        within the web resource, yielding each one as soon as it is found.
+
+        Args:
+            raw (bytes): The content of the web resource.
+
+        Yields:
+            tuple: The reference link, its HTML tag, whether it is an external link, and whether it is a bad link.
+        """
+        try:
+            # Only build the allowed tags, skipping the rest of the document tree
+            strainer = SoupStrainer(self.allowed_tags)
+            soup = BS(raw, "lxml", parse_only=strainer)
+            del raw
+            for tag in soup.find_all(self.allowed_tags):
+                link = ""
+                match (tag.name):
+                    case "a" | "link":
+                        link = tag.get("href")
+                    case "img" | "script":
+                        link = tag.get("src")
+                    case "source":
+                        link = tag.get("srcset")
+                    case _:
+                        log.warning("tag %s didn't match any case", tag.name)
+                rp = RP(self, link)
+                reference = rp.link or rp.bad_link
+                is_external_link = self.is_external_link(
+                    reference=reference, url_root=self.url_root
                 )
-        except AssertionError as e:
-            print(f"[ERROR] Processing the path [{self.path}] failed, [{e}]")
+                if is_external_link and not self.enable_external_link_processing:
+                    # Handle external links according to your logic
+                    continue
+                yield reference, tag, is_external_link, not rp.link
+        except Exception as e:
+            # Catching exception is intentional; it is not to interrupt the resource processing for any reason
+            self.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            log.error("Processing the path [%s] failed, [%s]", self.path, self.error)
 
     def _url_root(self):
         """
@@ -208,15 +223,20 @@ class Resource:
         Returns:
             dict: Filtered HTTP headers of the resource.
         """
-        if hasattr(self, "headers"):
-            headers = self.headers
-            return {key: headers[key] for key in self.allowed_headers if headers[key]}
+        return {
+            key: value
+            for key in self.allowed_headers
+            if (value := self.headers.get(key))
+        }
 
-    @classmethod
-    def is_valid_url(cls, url):
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def is_valid_url(url):
         """
         Check if a URL is valid.
 
+        Results are cached, as the same URL is validated several times while processing references.
+
         Args:
             url (str): The URL to check.
 
@@ -243,8 +263,9 @@ class Resource:
             else:
                 return False
 
-    @classmethod
-    def get_url_root(cls, url):
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def get_url_root(url):
         """
         Extract the root URL from a given URL.
 
@@ -257,3 +278,24 @@ class Resource:
         url = urlparse(url)
         if url.netloc:
             return f"{url.scheme}://{url.netloc}"
+
+    @classmethod
+    def create_session(cls):
+        """
+        Create a client session whose connections are reused across resources.
+
+        The session keeps connections alive and negotiates HTTP/2 where the server supports it, so
+        concurrent requests to the same host are multiplexed over a single connection instead of
+        paying a TCP and TLS handshake each.
+
+        Returns:
+            httpx.AsyncClient: The client session to pass to fetch.
+        """
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        return httpx.AsyncClient(
+            http2=True,
+            limits=limits,
+            headers=HEADERS,
+            timeout=TIMEOUT,
+            follow_redirects=True,
+        )
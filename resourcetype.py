@@ -1,5 +1,6 @@
-import re
 from enum import Enum
+from posixpath import splitext
+from urllib.parse import urlparse
 
 
 class ResourceType(Enum):
@@ -49,12 +50,20 @@ class ResourceType(Enum):
             >>> ResourceType.find(url)
             ResourceType.CSS
         """
-        if re.match(r".+?(\.html|\.htm).*?", url):
-            return ResourceType.PAGE
-        if re.match(r".+?(\.png|\.jpg|\.jpeg|\.gif|\.svg|\.ico).*?", url):
-            return ResourceType.IMG
-        if re.match(r".+?(\.js).*?", url):
-            return ResourceType.JS
-        if re.match(r".+?(\.css).*?", url):
-            return ResourceType.CSS
-        return ResourceType.NO_EXTENSION
+        extension = splitext(urlparse(url).path)[1].lower()
+        return EXTENSION_TYPES.get(extension, ResourceType.NO_EXTENSION)
+
+
+# Resource types keyed by the file extension of the URL path
+EXTENSION_TYPES = {
+    ".html": ResourceType.PAGE,
+    ".htm": ResourceType.PAGE,
+    ".png": ResourceType.IMG,
+    ".jpg": ResourceType.IMG,
+    ".jpeg": ResourceType.IMG,
+    ".gif": ResourceType.IMG,
+    ".svg": ResourceType.IMG,
+    ".ico": ResourceType.IMG,
+    ".js": ResourceType.JS,
+    ".css": ResourceType.CSS,
+}
@@ -1,4 +1,13 @@
+import asyncio
+import csv
+import io
+import httpx
+import pytest
 import project as wrp
+import resource
+from resource import Resource
+from refprocessor import RefProcessor
+from resourcetype import ResourceType
 from datetime import datetime
 
 
@@ -10,6 +19,48 @@ def test_reabable_time():
 
 def test_file_name():
     assert wrp.get_file_name("test.csv").endswith(".csv")
+    assert (
+        wrp.get_file_name("test.csv", datetime(2023, 1, 2)) == "test-20230102000000.csv"
+    )
+
+
+def test_invalid_file_name():
+    with pytest.raises(SystemExit):
+        wrp.get_file_name("test.csvv")
+
+
+def test_field_names():
+    assert wrp.get_field_names(["Cache-Control", "Pragma"]) == [
+        "URL",
+        "Domain",
+        "Type",
+        "Cache-Control",
+        "Pragma",
+        "Tag",
+        "Error",
+    ]
+
+
+def test_update_data_columns():
+    headers = ["Cache-Control", "Pragma"]
+    r = Resource("https://www.example.com/logo.png")
+    r.filtered_headers = {"Cache-Control": "max-age=60"}
+    r.error = "HTTP status code is [404]"
+    output = io.StringIO()
+    writer = wrp.csv_writer(output, wrp.get_field_names(headers))
+    wrp.update_data(r, "<img/>", headers, writer)
+    output.seek(0)
+    assert list(csv.DictReader(output)) == [
+        {
+            "URL": "https://www.example.com/logo.png",
+            "Domain": "example.com",
+            "Type": "Image",
+            "Cache-Control": "max-age=60",
+            "Pragma": "",
+            "Tag": "<img/>",
+            "Error": "HTTP status code is [404]",
+        }
+    ]
 
 
 def test_urls():
@@ -25,3 +76,229 @@ def test_flag_true():
 
 def test_flag_false():
     wrp.get_flag("n") == False
+
+
+def test_resource_type():
+    assert ResourceType.find("https://www.example.com/index.html") == ResourceType.PAGE
+    assert ResourceType.find("https://www.example.com/logo.PNG?v=2") == ResourceType.IMG
+    assert (
+        ResourceType.find("https://cdn.jsdelivr.net/app") == ResourceType.NO_EXTENSION
+    )
+    assert (
+        ResourceType.find("https://www.example.com/v1.2/app")
+        == ResourceType.NO_EXTENSION
+    )
+
+
+def test_filter_headers_missing_header():
+    r = Resource("https://www.example.com/logo.png")
+    r.headers = httpx.Headers({"Cache-Control": "max-age=60"})
+    assert r._filter_headers() == {"Cache-Control": "max-age=60"}
+
+
+def test_relative_path_nested():
+    page = Resource("https://www.example.com/a/b/c.html")
+    assert (
+        RefProcessor(page, "../img.png").link == "https://www.example.com/a/b/img.png"
+    )
+
+
+def test_relative_path_trailing_slash():
+    page = Resource("https://www.example.com/a/b/")
+    assert RefProcessor(page, "../img.png").link == "https://www.example.com/a/img.png"
+
+
+def test_relative_path_empty_path():
+    page = Resource("https://www.example.com")
+    assert RefProcessor(page, "../img.png").link == "https://www.example.com/img.png"
+
+
+def test_relative_path_too_many_levels():
+    page = Resource("https://www.example.com/a/b.html")
+    assert (
+        RefProcessor(page, "../../../img.png").link == "https://www.example.com/img.png"
+    )
+
+
+def test_relative_path_strips_leading_run_only():
+    page = Resource("https://www.example.com/a/b/c.html")
+    assert (
+        RefProcessor(page, "../x/../img.png").link
+        == "https://www.example.com/a/b/x/../img.png"
+    )
+
+
+def _classify_references(flag):
+    page = Resource(
+        "https://www.example.com/a/b.html", enable_external_link_processing=flag
+    )
+    samples = [
+        "//x",
+        "/",
+        "//",
+        "/c.png",
+        "../../a",
+        "#top",
+        "tel:123",
+        "javascript:void(0)",
+        "https://other.com/x",
+    ]
+    processed = {}
+    for reference in samples:
+        rp = RefProcessor(page, reference)
+        processed[reference] = (rp.link, rp.bad_link)
+    return processed
+
+
+def test_references_external_link_processing_disabled():
+    assert _classify_references(False) == {
+        "//x": ("", "//x"),
+        "/": ("", "/"),
+        "//": ("", "//"),
+        "/c.png": ("https://www.example.com/c.png", ""),
+        "../../a": ("https://www.example.com/a", ""),
+        "#top": ("#top", ""),
+        "tel:123": ("tel:123", ""),
+        "javascript:void(0)": ("javascript:void(0)", ""),
+        "https://other.com/x": ("", "https://other.com/x"),
+    }
+
+
+def test_references_external_link_processing_enabled():
+    assert _classify_references(True) == {
+        "//x": ("https://x", ""),
+        "/": ("/", ""),
+        "//": ("//", ""),
+        "/c.png": ("https://www.example.com/c.png", ""),
+        "../../a": ("https://www.example.com/a", ""),
+        "#top": ("#top", ""),
+        "tel:123": ("tel:123", ""),
+        "javascript:void(0)": ("javascript:void(0)", ""),
+        "https://other.com/x": ("https://other.com/x", ""),
+    }
+
+
+HEADERS = ["Cache-Control", "Pragma"]
+TAGS = ["a", "link", "script", "source", "img"]
+
+
+def _process_urls(monkeypatch, handler, urls):
+    """Run process_urls over a mocked transport, returning the CSV rows and the requests sent."""
+    requests = []
+
+    def transport(request):
+        requests.append((request.method, request.url.path))
+        return handler(request)
+
+    monkeypatch.setattr(
+        Resource,
+        "create_session",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(transport)),
+    )
+    output = io.StringIO()
+    writer = wrp.csv_writer(output, wrp.get_field_names(HEADERS))
+    asyncio.run(wrp.process_urls(urls, HEADERS, TAGS, False, None, writer))
+    output.seek(0)
+    return sorted(list(csv.reader(output))[1:]), requests
+
+
+def _page(*srcs):
+    return httpx.Response(200, html="".join(f'<img src="{src}">' for src in srcs))
+
+
+def test_process_urls_rows(monkeypatch):
+    def handler(request):
+        if request.url.path == "/a.html":
+            return _page("/logo.png", "/missing.png")
+        if request.url.path == "/logo.png":
+            return httpx.Response(200, headers={"Cache-Control": "max-age=60"})
+        return httpx.Response(404)
+
+    rows, _ = _process_urls(monkeypatch, handler, ["https://www.example.com/a.html"])
+    assert rows == [
+        [
+            "https://www.example.com/logo.png",
+            "example.com",
+            "Image",
+            "max-age=60",
+            "",
+            "",
+            "",
+        ],
+        [
+            "https://www.example.com/missing.png",
+            "example.com",
+            "Image",
+            "",
+            "",
+            "",
+            "HTTP status code is [404]",
+        ],
+    ]
+
+
+def test_process_urls_fetches_repeated_link_once(monkeypatch):
+    def handler(request):
+        if request.url.path.endswith(".html"):
+            return _page("/logo.png", "/logo.png")
+        return httpx.Response(200)
+
+    rows, requests = _process_urls(
+        monkeypatch,
+        handler,
+        ["https://www.example.com/a.html", "https://www.example.com/b.html"],
+    )
+    assert requests.count(("HEAD", "/logo.png")) == 1
+    # The reference is listed once for each page it is found in
+    assert [row[0] for row in rows] == ["https://www.example.com/logo.png"] * 2
+
+
+def test_process_urls_head_falls_back_to_get(monkeypatch):
+    def handler(request):
+        if request.url.path == "/a.html":
+            return _page("/logo.png")
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        return httpx.Response(200, headers={"Pragma": "no-cache"})
+
+    rows, requests = _process_urls(
+        monkeypatch, handler, ["https://www.example.com/a.html"]
+    )
+    assert requests == [
+        ("GET", "/a.html"),
+        ("HEAD", "/logo.png"),
+        ("GET", "/logo.png"),
+    ]
+    assert rows[0][4] == "no-cache"
+
+
+def test_process_urls_partial_parse_failure(monkeypatch):
+    class FailingRefProcessor(RefProcessor):
+        def __init__(self, resource, reference):
+            if reference == "/broken.png":
+                raise ValueError("broken reference")
+            super().__init__(resource, reference)
+
+    def handler(request):
+        if request.url.path == "/a.html":
+            return _page("/logo.png", "/broken.png")
+        return httpx.Response(200)
+
+    monkeypatch.setattr(resource, "RP", FailingRefProcessor)
+    rows, _ = _process_urls(monkeypatch, handler, ["https://www.example.com/a.html"])
+    assert [(row[0], row[-1]) for row in rows] == [
+        ("https://www.example.com/a.html", "ValueError: broken reference"),
+        ("https://www.example.com/logo.png", ""),
+    ]
+
+
+def test_process_urls_timeout_error(monkeypatch):
+    def handler(request):
+        if request.url.path == "/a.html":
+            return _page("/logo.png")
+        raise httpx.ReadTimeout("", request=request)
+
+    rows, _ = _process_urls(monkeypatch, handler, ["https://www.example.com/a.html"])
+    assert [(row[0], row[-1]) for row in rows] == [
+        ("https://www.example.com/logo.png", "ReadTimeout")
+    ]